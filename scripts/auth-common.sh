@@ -19,6 +19,9 @@ fi
 
 IRONIC_HTPASSWD_FILE="${IRONIC_CONF_DIR}/htpasswd"
 export IRONIC_RPC_HTPASSWD_FILE="${IRONIC_HTPASSWD_FILE}-rpc"
+# bcrypt cost used when hashing the JSON RPC credentials (htpasswd -C, 4-17)
+export IRONIC_HTPASSWD_BCRYPT_COST="${IRONIC_HTPASSWD_BCRYPT_COST:-5}"
+IRONIC_RPC_FINGERPRINT_FILE="${IRONIC_RPC_HTPASSWD_FILE}.fingerprint"
 if [[ -f "/auth/ironic/htpasswd" ]]; then
     IRONIC_HTPASSWD=$(</auth/ironic/htpasswd)
 fi
@@ -44,6 +47,47 @@ if [[ -z "${IRONIC_OCI_AUTH_CONFIG:-}" ]] && [[ -f "/auth/oci.json" ]]; then
     export IRONIC_OCI_AUTH_CONFIG="/auth/oci.json"
 fi
 
+# Print a fingerprint of the bcrypt cost and of the mounted secret files. It
+# only uses file metadata, so nothing derived from the password is stored or
+# logged. Resolving symlinks follows the Kubernetes "..data" link, whose target
+# changes every time the secret is updated.
+secret_fingerprint()
+{
+    local file
+
+    printf "cost %s\n" "${IRONIC_HTPASSWD_BCRYPT_COST}"
+    for file in "$@"; do
+        stat -L -c "%n %d %i %s %Y %Z" "$(readlink -f "${file}")"
+    done
+}
+
+# bcrypt is deliberately slow, so only hash the JSON RPC credentials when the
+# mounted secret changed since the existing htpasswd file was generated
+write_json_rpc_htpasswd()
+{
+    local username_file=$1
+    local password_file=$2
+    local fingerprint
+
+    set +x
+    fingerprint=$(secret_fingerprint "${username_file}" "${password_file}")
+    if [[ -s "${IRONIC_RPC_HTPASSWD_FILE}" ]] && [[ -f "${IRONIC_RPC_FINGERPRINT_FILE}" ]] \
+        && [[ "$(<"${IRONIC_RPC_FINGERPRINT_FILE}")" == "${fingerprint}" ]]; then
+        set -x
+        echo "INFO: JSON RPC credentials unchanged, using cached htpasswd hash"
+        return
+    fi
+    set -x
+
+    echo "INFO: hashing JSON RPC credentials with bcrypt cost ${IRONIC_HTPASSWD_BCRYPT_COST}"
+    # Never leave a fingerprint behind for a partially written htpasswd file
+    rm -f "${IRONIC_RPC_FINGERPRINT_FILE}"
+    htpasswd -c -i -B -C "${IRONIC_HTPASSWD_BCRYPT_COST}" "${IRONIC_RPC_HTPASSWD_FILE}" "$(<"${username_file}")" <"${password_file}"
+    set +x
+    printf "%s\n" "${fingerprint}" > "${IRONIC_RPC_FINGERPRINT_FILE}"
+    set -x
+}
+
 configure_json_rpc_auth()
 {
     local GROUP=${1:-json_rpc}
@@ -68,13 +112,14 @@ configure_json_rpc_auth()
 
     if [[ -z "${IRONIC_RPC_HTPASSWD}" ]]; then
         if [[ -f "${username_file}" ]] && [[ -f "${password_file}" ]]; then
-            htpasswd -c -i -B "${IRONIC_RPC_HTPASSWD_FILE}" "$(<${username_file})" <"${password_file}"
+            write_json_rpc_htpasswd "${username_file}" "${password_file}"
         else
             echo "FATAL: enabling JSON RPC requires authentication"
             echo "HINT: mount a secret with either username and password or htpasswd under /auth/ironic-rpc"
             exit 1
         fi
     else
+        rm -f "${IRONIC_RPC_FINGERPRINT_FILE}"
         printf "%s\n" "${IRONIC_RPC_HTPASSWD}" > "${IRONIC_RPC_HTPASSWD_FILE}"
     fi
 }
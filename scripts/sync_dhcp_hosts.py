@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Keep a dnsmasq ``dhcp-hostsdir`` in sync with a node inventory.
+
+dnsmasq watches ``dhcp-hostsdir`` with inotify and loads new or changed
+files without a restart, so in-flight DHCP/TFTP sessions survive
+reservation updates.  This tool writes one ``<name>.hosts`` file per node
+and only touches files whose content actually changed.  Every write goes
+through a dot-prefixed temporary file followed by ``rename()``: dnsmasq
+ignores dotfiles and therefore only ever reads complete files.
+
+dnsmasq never forgets records it has loaded from ``dhcp-hostsdir``; a
+removed or rewritten reservation keeps its old entry until dnsmasq gets a
+SIGHUP.  SIGHUP re-reads the configuration without dropping the process,
+so pass ``--sighup`` to send one whenever a stale entry has to go.
+
+The inventory is a JSON list of nodes::
+
+    [
+        {"name": "worker-0", "mac": "00:20:e0:3b:13:af",
+         "ip": "172.22.0.10", "tags": ["worker"], "hostname": "worker-0"}
+    ]
+
+Only ``name`` and ``mac`` are required.
+
+Usage
+-----
+sync_dhcp_hosts.py [--sighup] <inventory.json> <hostsdir>
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Any, NamedTuple
+
+# Type alias for the node entries of the inventory.
+Node = dict[str, Any]
+
+HOSTS_SUFFIX: str = ".hosts"
+
+_MAC_RE = re.compile(r"^([0-9a-f]{2}:){5}[0-9a-f]{2}$")
+_NAME_RE = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+_TAG_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+# dhcp-host fields that dnsmasq would not read as a hostname
+_LEASE_TIME_RE = re.compile(r"^\d+[smhdw]?$")
+_RESERVED_WORDS: set[str] = {"ignore", "infinite"}
+
+
+def _is_ip_address(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+class SyncResult(NamedTuple):
+    added: list[str]
+    updated: list[str]
+    removed: list[str]
+    unchanged: list[str]
+
+
+# -- Rendering -------------------------------------------------------------
+
+def render_host_line(node: Node) -> str:
+    """Return the ``dhcp-host`` line for *node*.
+
+    The format is ``<mac>[,set:<tag>...][,<ip>][,<hostname>]``, IPv6
+    addresses are wrapped in brackets as dnsmasq expects.
+
+    Raises ``ValueError`` if any field is malformed.
+    """
+    name: str = str(node.get("name", ""))
+    if not _NAME_RE.match(name):
+        raise ValueError(f"invalid node name {name!r}")
+
+    mac: str = str(node.get("mac", "")).strip().lower()
+    if not _MAC_RE.match(mac):
+        raise ValueError(f"node {name}: invalid MAC address {mac!r}")
+    fields: list[str] = [mac]
+
+    tags = node.get("tags") or []
+    if not isinstance(tags, list):
+        raise ValueError(f"node {name}: tags must be a list, got {tags!r}")
+    for tag in tags:
+        if not _TAG_RE.match(str(tag)):
+            raise ValueError(f"node {name}: invalid tag {tag!r}")
+        fields.append(f"set:{tag}")
+
+    if node.get("ip"):
+        try:
+            ip = ipaddress.ip_address(str(node["ip"]))
+        except ValueError:
+            raise ValueError(
+                f"node {name}: invalid IP address {node['ip']!r}") from None
+        fields.append(f"[{ip}]" if ip.version == 6 else str(ip))
+
+    if node.get("hostname"):
+        hostname: str = str(node["hostname"])
+        if (not _NAME_RE.match(hostname)
+                or hostname.lower() in _RESERVED_WORDS
+                or _LEASE_TIME_RE.match(hostname)
+                or _is_ip_address(hostname)):
+            raise ValueError(f"node {name}: invalid hostname {hostname!r}")
+        fields.append(hostname)
+
+    return ",".join(fields)
+
+
+def desired_files(nodes: list[Node]) -> dict[str, str]:
+    """Map each ``<name>.hosts`` file name to its expected content.
+
+    Raises ``ValueError`` on duplicate node names or MAC addresses.
+    """
+    files: dict[str, str] = {}
+    macs: set[str] = set()
+    for node in nodes:
+        line: str = render_host_line(node)
+        filename: str = f"{node['name']}{HOSTS_SUFFIX}"
+        if filename in files:
+            raise ValueError(f"duplicate node name {node['name']!r}")
+        mac: str = line.split(",", 1)[0]
+        if mac in macs:
+            raise ValueError(f"duplicate MAC address {mac!r}")
+        macs.add(mac)
+        files[filename] = line + "\n"
+    return files
+
+
+# -- Filesystem ------------------------------------------------------------
+
+def load_inventory(path: str) -> list[Node]:
+    """Load the JSON node inventory from *path*."""
+    with open(path, encoding="utf-8") as f:
+        nodes = json.load(f)
+    if not isinstance(nodes, list) or not all(
+            isinstance(n, dict) for n in nodes):
+        raise ValueError(f"{path}: inventory must be a JSON list of objects")
+    return nodes
+
+
+def current_files(hostsdir: str) -> dict[str, str]:
+    """Return the content of the ``*.hosts`` files managed in *hostsdir*."""
+    files: dict[str, str] = {}
+    for entry in os.scandir(hostsdir):
+        if (entry.name.startswith(".")
+                or not entry.name.endswith(HOSTS_SUFFIX)
+                or not entry.is_file()):
+            continue
+        with open(entry.path, encoding="utf-8") as f:
+            files[entry.name] = f.read()
+    return files
+
+
+def _atomic_write(path: str, content: str) -> None:
+    """Replace *path* with *content* so readers never see a partial file."""
+    dirname, basename = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{basename}.", dir=dirname)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def sync(hostsdir: str, files: dict[str, str]) -> SyncResult:
+    """Make the ``*.hosts`` files in *hostsdir* match *files*.
+
+    Only files that differ are written or removed; files not ending in
+    ``.hosts`` are left alone.
+    """
+    existing: dict[str, str] = current_files(hostsdir)
+    result = SyncResult([], [], [], [])
+
+    for filename, content in sorted(files.items()):
+        if filename not in existing:
+            result.added.append(filename)
+        elif existing[filename] != content:
+            result.updated.append(filename)
+        else:
+            result.unchanged.append(filename)
+            continue
+        _atomic_write(os.path.join(hostsdir, filename), content)
+
+    for filename in sorted(set(existing) - set(files)):
+        os.unlink(os.path.join(hostsdir, filename))
+        result.removed.append(filename)
+
+    return result
+
+
+# -- CLI entry point -------------------------------------------------------
+
+_USAGE: str = "Usage: sync_dhcp_hosts.py [--sighup] <inventory.json> <hostsdir>"
+
+
+def main() -> None:
+    args: list[str] = sys.argv[1:]
+    sighup: bool = "--sighup" in args
+    args = [a for a in args if a != "--sighup"]
+
+    if len(args) != 2:
+        print(f"ERROR: expected an inventory and a directory\n{_USAGE}",
+              file=sys.stderr)
+        sys.exit(1)
+
+    inventory, hostsdir = args
+    try:
+        result: SyncResult = sync(
+            hostsdir, desired_files(load_inventory(inventory)))
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"added={len(result.added)} updated={len(result.updated)}"
+          f" removed={len(result.removed)}"
+          f" unchanged={len(result.unchanged)}")
+
+    # Loaded records are only dropped on SIGHUP, see module docstring.
+    if sighup and (result.updated or result.removed):
+        pkill = subprocess.run(["pkill", "-HUP", "-x", "dnsmasq"], check=False)
+        if pkill.returncode != 0:
+            print("ERROR: no dnsmasq process was sent SIGHUP, changed or"
+                  " removed reservations keep their old record",
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Unit tests for sync_dhcp_hosts.py."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import sync_dhcp_hosts
+
+
+def _node(name="node-0", mac="00:20:e0:3b:13:af", **kwargs):
+    """Build a minimal inventory entry."""
+    return dict(name=name, mac=mac, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# render_host_line
+# ---------------------------------------------------------------------------
+
+class TestRenderHostLine(unittest.TestCase):
+
+    def test_mac_only(self):
+        self.assertEqual(
+            sync_dhcp_hosts.render_host_line(_node()),
+            "00:20:e0:3b:13:af")
+
+    def test_mac_normalized(self):
+        self.assertEqual(
+            sync_dhcp_hosts.render_host_line(_node(mac=" 00:20:E0:3B:13:AF")),
+            "00:20:e0:3b:13:af")
+
+    def test_all_fields(self):
+        node = _node(ip="172.22.0.10", tags=["worker", "efi"],
+                     hostname="worker-0")
+        self.assertEqual(
+            sync_dhcp_hosts.render_host_line(node),
+            "00:20:e0:3b:13:af,set:worker,set:efi,172.22.0.10,worker-0")
+
+    def test_ipv6_bracketed(self):
+        node = _node(ip="fd00:1101::10")
+        self.assertEqual(
+            sync_dhcp_hosts.render_host_line(node),
+            "00:20:e0:3b:13:af,[fd00:1101::10]")
+
+    def test_invalid_mac(self):
+        with self.assertRaises(ValueError):
+            sync_dhcp_hosts.render_host_line(_node(mac="00:20:e0:3b:13"))
+
+    def test_invalid_ip(self):
+        with self.assertRaises(ValueError):
+            sync_dhcp_hosts.render_host_line(_node(ip="172.22.0.300"))
+
+    def test_invalid_tag(self):
+        with self.assertRaises(ValueError):
+            sync_dhcp_hosts.render_host_line(_node(tags=["a,b"]))
+
+    def test_tags_not_a_list(self):
+        for tags in ("worker", 5):
+            with self.subTest(tags=tags):
+                with self.assertRaisesRegex(ValueError, "node-0"):
+                    sync_dhcp_hosts.render_host_line(_node(tags=tags))
+
+    def test_hostname_not_a_dhcp_host_keyword(self):
+        for hostname in ("ignore", "IGNORE", "infinite", "12h", "3600",
+                         "10.0.0.5"):
+            with self.subTest(hostname=hostname):
+                with self.assertRaises(ValueError):
+                    sync_dhcp_hosts.render_host_line(
+                        _node(hostname=hostname))
+
+    def test_invalid_name(self):
+        for name in ("", ".hidden", "../escape", "a/b"):
+            with self.subTest(name=name):
+                with self.assertRaises(ValueError):
+                    sync_dhcp_hosts.render_host_line(_node(name=name))
+
+
+# ---------------------------------------------------------------------------
+# desired_files
+# ---------------------------------------------------------------------------
+
+class TestDesiredFiles(unittest.TestCase):
+
+    def test_one_file_per_node(self):
+        files = sync_dhcp_hosts.desired_files([
+            _node("a", "00:00:00:00:00:01"),
+            _node("b", "00:00:00:00:00:02", ip="172.22.0.11"),
+        ])
+        self.assertEqual(files, {
+            "a.hosts": "00:00:00:00:00:01\n",
+            "b.hosts": "00:00:00:00:00:02,172.22.0.11\n",
+        })
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            sync_dhcp_hosts.desired_files([
+                _node("a", "00:00:00:00:00:01"),
+                _node("a", "00:00:00:00:00:02"),
+            ])
+
+    def test_duplicate_mac(self):
+        with self.assertRaises(ValueError):
+            sync_dhcp_hosts.desired_files([
+                _node("a", "00:00:00:00:00:01"),
+                _node("b", "00:00:00:00:00:01"),
+            ])
+
+
+# ---------------------------------------------------------------------------
+# sync
+# ---------------------------------------------------------------------------
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.hostsdir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, name, content):
+        with open(os.path.join(self.hostsdir, name), "w") as f:
+            f.write(content)
+
+    def test_populates_empty_dir(self):
+        result = sync_dhcp_hosts.sync(self.hostsdir, {"a.hosts": "x\n"})
+        self.assertEqual(result.added, ["a.hosts"])
+        self.assertEqual(os.listdir(self.hostsdir), ["a.hosts"])
+        with open(os.path.join(self.hostsdir, "a.hosts")) as f:
+            self.assertEqual(f.read(), "x\n")
+
+    def test_only_changed_files_written(self):
+        self._write("a.hosts", "x\n")
+        self._write("b.hosts", "y\n")
+        mtime = os.stat(os.path.join(self.hostsdir, "a.hosts")).st_mtime_ns
+
+        with mock.patch.object(sync_dhcp_hosts, "_atomic_write",
+                               wraps=sync_dhcp_hosts._atomic_write) as write:
+            result = sync_dhcp_hosts.sync(
+                self.hostsdir, {"a.hosts": "x\n", "b.hosts": "z\n"})
+
+        self.assertEqual(result.unchanged, ["a.hosts"])
+        self.assertEqual(result.updated, ["b.hosts"])
+        write.assert_called_once_with(
+            os.path.join(self.hostsdir, "b.hosts"), "z\n")
+        self.assertEqual(
+            os.stat(os.path.join(self.hostsdir, "a.hosts")).st_mtime_ns,
+            mtime)
+
+    def test_removes_stale_hosts_only(self):
+        self._write("gone.hosts", "x\n")
+        self._write("manual.conf", "y\n")
+        self._write(".gone.hosts.tmp", "z\n")
+
+        result = sync_dhcp_hosts.sync(self.hostsdir, {})
+
+        self.assertEqual(result.removed, ["gone.hosts"])
+        self.assertEqual(sorted(os.listdir(self.hostsdir)),
+                         [".gone.hosts.tmp", "manual.conf"])
+
+    def test_no_temp_files_left(self):
+        sync_dhcp_hosts.sync(self.hostsdir, {"a.hosts": "x\n"})
+        sync_dhcp_hosts.sync(self.hostsdir, {"a.hosts": "y\n"})
+        self.assertEqual(os.listdir(self.hostsdir), ["a.hosts"])
+
+    def test_failed_write_keeps_old_file(self):
+        self._write("a.hosts", "x\n")
+        with mock.patch.object(sync_dhcp_hosts.os, "replace",
+                               side_effect=OSError("boom")):
+            with self.assertRaises(OSError):
+                sync_dhcp_hosts.sync(self.hostsdir, {"a.hosts": "y\n"})
+        self.assertEqual(os.listdir(self.hostsdir), ["a.hosts"])
+        with open(os.path.join(self.hostsdir, "a.hosts")) as f:
+            self.assertEqual(f.read(), "x\n")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.hostsdir = os.path.join(self._tmp.name, "hostsdir")
+        os.mkdir(self.hostsdir)
+        self.inventory = os.path.join(self._tmp.name, "nodes.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, nodes, *flags, returncode=0):
+        with open(self.inventory, "w") as f:
+            json.dump(nodes, f)
+        argv = ["sync_dhcp_hosts.py", *flags, self.inventory, self.hostsdir]
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch.object(sync_dhcp_hosts.subprocess, "run") as run, \
+                mock.patch("builtins.print") as mock_print:
+            run.return_value.returncode = returncode
+            sync_dhcp_hosts.main()
+        return run, mock_print
+
+    def test_reports_counts(self):
+        _, mock_print = self._run([_node()])
+        mock_print.assert_called_once_with(
+            "added=1 updated=0 removed=0 unchanged=0")
+
+    def test_sighup_on_removal(self):
+        self._run([_node()])
+        run, _ = self._run([], "--sighup")
+        run.assert_called_once_with(
+            ["pkill", "-HUP", "-x", "dnsmasq"], check=False)
+
+    def test_sighup_without_dnsmasq_exits(self):
+        self._run([_node()])
+        with self.assertRaises(SystemExit) as cm:
+            self._run([], "--sighup", returncode=1)
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_no_sighup_on_addition(self):
+        run, _ = self._run([_node()], "--sighup")
+        run.assert_not_called()
+
+    def test_no_sighup_without_flag(self):
+        self._run([_node()])
+        run, _ = self._run([])
+        run.assert_not_called()
+
+    def test_invalid_tags_exits(self):
+        with self.assertRaises(SystemExit) as cm:
+            self._run([_node(tags=5)])
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_invalid_inventory_exits(self):
+        with open(self.inventory, "w") as f:
+            json.dump({"not": "a list"}, f)
+        argv = ["sync_dhcp_hosts.py", self.inventory, self.hostsdir]
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch("builtins.print"):
+            with self.assertRaises(SystemExit) as cm:
+                sync_dhcp_hosts.main()
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_missing_args_exits(self):
+        with mock.patch.object(sys, "argv", ["sync_dhcp_hosts.py"]), \
+                mock.patch("builtins.print"):
+            with self.assertRaises(SystemExit) as cm:
+                sync_dhcp_hosts.main()
+        self.assertEqual(cm.exception.code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
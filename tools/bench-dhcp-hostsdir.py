@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""Benchmark dnsmasq ``dhcp-hostsdir`` reservations.
+
+Starts a throw-away dnsmasq in a network namespace, fills its hostsdir
+with ``--reservations`` nodes through scripts/sync_dhcp_hosts.py and then
+reports, from a second namespace connected by a veth pair:
+
+- DHCPOFFER latency for randomly chosen reserved MAC addresses;
+- the time from syncing a newly added node until dnsmasq offers its
+  reserved address (picked up by inotify, no restart);
+- the time from rewriting a node's reservation plus SIGHUP until dnsmasq
+  offers the new address.
+
+Needs root, iproute2 and dnsmasq on the host.  Example::
+
+    sudo ./tools/bench-dhcp-hostsdir.py --reservations 5000 --samples 500
+"""
+
+import argparse
+import json
+import os
+import random
+import select
+import signal
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import sync_dhcp_hosts  # noqa: E402
+
+SRV_NS = "dhcpbench-srv"
+CLI_NS = "dhcpbench-cli"
+SRV_IF = "dhcpb-srv"
+CLI_IF = "dhcpb-cli"
+SRV_IP = "10.200.255.254/16"
+CLI_IP = "10.200.255.253/16"
+DHCP_RANGE = "10.200.0.0,static,255.255.0.0"
+
+
+def log(msg):
+    print(msg, file=sys.stderr)
+
+
+def run(*cmd):
+    subprocess.run(cmd, check=True)
+
+
+# -- DHCP client (runs inside CLI_NS) --------------------------------------
+
+def discover_packet(mac, xid):
+    """Build a broadcast DHCPDISCOVER for *mac*."""
+    chaddr = bytes.fromhex(mac.replace(":", "")).ljust(16, b"\0")
+    header = struct.pack("!BBBBIHH4s4s4s4s16s64s128s",
+                         1, 1, 6, 0, xid, 0, 0x8000,
+                         b"\0" * 4, b"\0" * 4, b"\0" * 4, b"\0" * 4,
+                         chaddr, b"", b"")
+    options = b"\x63\x82\x53\x63" + b"\x35\x01\x01" + b"\xff"
+    return (header + options).ljust(300, b"\0")
+
+
+def parse_offer(data, xids):
+    """Return the offered address if *data* is a DHCPOFFER for *xids*."""
+    if len(data) < 240 or struct.unpack("!I", data[4:8])[0] not in xids:
+        return None
+    opts = data[240:]
+    i = 0
+    while i < len(opts) and opts[i] != 255:
+        if opts[i] == 0:
+            i += 1
+            continue
+        code, length = opts[i], opts[i + 1]
+        if code == 53 and opts[i + 2] == 2:
+            return socket.inet_ntoa(data[16:20])
+        i += 2 + length
+    return None
+
+
+def client_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE,
+                    CLI_IF.encode())
+    sock.bind(("", 68))
+    return sock
+
+
+def request_offer(sock, mac, timeout):
+    """Send one DISCOVER; return ``(offered_ip, rtt)`` or ``(None, None)``."""
+    xid = random.getrandbits(32)
+    start = time.monotonic()
+    sock.sendto(discover_packet(mac, xid), ("255.255.255.255", 67))
+    deadline = start + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        sock.settimeout(remaining)
+        try:
+            data = sock.recv(4096)
+        except socket.timeout:
+            break
+        ip = parse_offer(data, {xid})
+        if ip is not None:
+            return ip, time.monotonic() - start
+    return None, None
+
+
+def watch_offer(sock, mac, expect, wait, interval):
+    """Return the time *expect* is first offered to *mac*, or ``None``.
+
+    A DISCOVER goes out every *interval* seconds without waiting for an
+    answer, so the result is accurate to roughly *interval*.
+    """
+    xids = set()
+    now = time.monotonic()
+    deadline = now + wait
+    next_send = now
+    while now < deadline:
+        if now >= next_send:
+            xid = random.getrandbits(32)
+            xids.add(xid)
+            sock.sendto(discover_packet(mac, xid), ("255.255.255.255", 67))
+            next_send = now + interval
+        ready, _, _ = select.select(
+            [sock], [], [], max(next_send - time.monotonic(), 0))
+        if ready and parse_offer(sock.recv(4096), xids) == expect:
+            return time.monotonic()
+        now = time.monotonic()
+    return None
+
+
+def probe_main(args):
+    """Client side, executed in CLI_NS; prints JSON results on stdout."""
+    sock = client_socket()
+    if args.expect:
+        # Report the CLOCK_MONOTONIC time so the parent can compare it with
+        # its own.
+        seen = watch_offer(sock, args.macs[0], args.expect, args.wait,
+                           args.interval)
+        print(json.dumps({"seen": seen}))
+        return
+
+    rtts = []
+    for mac in args.macs:
+        ip, rtt = request_offer(sock, mac, args.wait)
+        rtts.append(rtt if ip is not None else None)
+    print(json.dumps({"rtts": rtts}))
+
+
+def probe(macs, expect=None, wait=1.0, interval=0.001, background=False):
+    cmd = ["ip", "netns", "exec", CLI_NS, sys.executable,
+           os.path.abspath(__file__), "probe", "--wait", str(wait)]
+    if expect:
+        cmd += ["--expect", expect, "--interval", str(interval)]
+    proc = subprocess.Popen(cmd + list(macs), stdout=subprocess.PIPE,
+                            text=True)
+    if background:
+        return proc
+    return json.loads(proc.communicate()[0])
+
+
+def finish(proc):
+    return json.loads(proc.communicate()[0])
+
+
+# -- Benchmark driver ------------------------------------------------------
+
+def node(i, ip=None):
+    return {
+        "name": f"node-{i}",
+        "mac": "02:00:" + ":".join(f"{b:02x}" for b in i.to_bytes(4, "big")),
+        "ip": ip or f"10.200.{i // 250}.{i % 250 + 1}",
+        "tags": ["bench"],
+    }
+
+
+def setup_netns():
+    run("ip", "netns", "add", SRV_NS)
+    run("ip", "netns", "add", CLI_NS)
+    run("ip", "link", "add", SRV_IF, "netns", SRV_NS, "type", "veth",
+        "peer", "name", CLI_IF, "netns", CLI_NS)
+    for ns, iface, addr in ((SRV_NS, SRV_IF, SRV_IP),
+                            (CLI_NS, CLI_IF, CLI_IP)):
+        run("ip", "-n", ns, "addr", "add", addr, "dev", iface)
+        run("ip", "-n", ns, "link", "set", iface, "up")
+        run("ip", "-n", ns, "link", "set", "lo", "up")
+
+
+def teardown_netns():
+    for ns in (SRV_NS, CLI_NS):
+        subprocess.run(["ip", "netns", "del", ns], check=False,
+                       stderr=subprocess.DEVNULL)
+
+
+def start_dnsmasq(workdir, hostsdir):
+    return subprocess.Popen([
+        "ip", "netns", "exec", SRV_NS, "dnsmasq", "-k",
+        "--conf-file=/dev/null",
+        f"--interface={SRV_IF}", "--bind-interfaces",
+        "--port=0",
+        "--no-ping",
+        f"--dhcp-range={DHCP_RANGE}",
+        f"--dhcp-hostsdir={hostsdir}",
+        f"--dhcp-leasefile={os.path.join(workdir, 'dnsmasq.leases')}",
+        f"--pid-file={os.path.join(workdir, 'dnsmasq.pid')}",
+        f"--log-facility={os.path.join(workdir, 'dnsmasq.log')}",
+    ])
+
+
+def summary(label, values):
+    if not values:
+        print(f"{label}: no samples")
+        return
+    values = sorted(v * 1000 for v in values)
+    p95 = statistics.quantiles(values, n=20)[-1] if len(values) > 1 \
+        else values[0]
+    print(f"{label}: n={len(values)} min={values[0]:.2f}ms"
+          f" median={statistics.median(values):.2f}ms"
+          f" p95={p95:.2f}ms max={values[-1]:.2f}ms")
+
+
+def timed_change(hostsdir, nodes, mac, expect, interval, dnsmasq=None):
+    """Return (sync seconds, seconds until *expect* is offered to *mac*)."""
+    watcher = probe([mac], expect=expect, wait=30, interval=interval,
+                    background=True)
+    # Let the watcher start polling before the clock starts.
+    time.sleep(0.5)
+    start = time.monotonic()
+    sync_dhcp_hosts.sync(hostsdir, sync_dhcp_hosts.desired_files(nodes))
+    synced = time.monotonic()
+    if dnsmasq is not None:
+        dnsmasq.send_signal(signal.SIGHUP)
+    seen = finish(watcher)["seen"]
+    if seen is None:
+        raise RuntimeError(f"dnsmasq never offered {expect} to {mac}")
+    return synced - start, seen - start
+
+
+def bench(args):
+    with tempfile.TemporaryDirectory(prefix="dhcpbench-") as workdir:
+        # dnsmasq drops privileges and must still read the hostsdir
+        os.chmod(workdir, 0o755)
+        hostsdir = os.path.join(workdir, "hostsdir")
+        os.mkdir(hostsdir)
+
+        nodes = [node(i) for i in range(args.reservations)]
+        start = time.monotonic()
+        sync_dhcp_hosts.sync(hostsdir, sync_dhcp_hosts.desired_files(nodes))
+        log(f"wrote {len(nodes)} reservations in"
+            f" {time.monotonic() - start:.2f}s")
+
+        interval = args.interval / 1000
+        resolution = f"resolution {args.interval:g}ms"
+        dnsmasq = None
+        # Clean up after an aborted run, "ip netns add" fails otherwise
+        teardown_netns()
+        try:
+            setup_netns()
+            dnsmasq = start_dnsmasq(workdir, hostsdir)
+            if probe([nodes[0]["mac"]], expect=nodes[0]["ip"],
+                     wait=30)["seen"] is None:
+                raise RuntimeError("dnsmasq did not answer")
+
+            sample = random.sample(nodes, min(args.samples, len(nodes)))
+            rtts = probe([n["mac"] for n in sample])["rtts"]
+            missed = rtts.count(None)
+            if missed:
+                log(f"WARNING: {missed} DISCOVERs were not answered")
+            summary(f"offer latency ({args.reservations} reservations)",
+                    [r for r in rtts if r is not None])
+
+            added, added_sync = [], []
+            for i in range(args.updates):
+                new = node(args.reservations + i)
+                nodes.append(new)
+                sync_time, latency = timed_change(
+                    hostsdir, nodes, new["mac"], new["ip"], interval)
+                added_sync.append(sync_time)
+                added.append(latency)
+            summary("add reservation: sync", added_sync)
+            summary("add reservation: sync to first offer (inotify,"
+                    f" {resolution})", added)
+
+            updated, updated_sync = [], []
+            for i in range(args.updates):
+                new_ip = f"10.200.200.{i + 1}"
+                nodes[i] = node(i, ip=new_ip)
+                sync_time, latency = timed_change(
+                    hostsdir, nodes, nodes[i]["mac"], new_ip, interval,
+                    dnsmasq)
+                updated_sync.append(sync_time)
+                updated.append(latency)
+            summary("change reservation: sync", updated_sync)
+            summary("change reservation: sync to first offer (SIGHUP,"
+                    f" {resolution})", updated)
+        finally:
+            if dnsmasq is not None:
+                dnsmasq.terminate()
+                dnsmasq.wait()
+            teardown_netns()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command")
+
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=500,
+                        help="DISCOVERs sent to measure offer latency")
+    parser.add_argument("--updates", type=int, default=10,
+                        help="reservations added and changed (1-254)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="milliseconds between DISCOVERs while waiting"
+                             " for a changed reservation")
+
+    probe_parser = sub.add_parser("probe", help=argparse.SUPPRESS)
+    probe_parser.add_argument("--wait", type=float, default=1.0)
+    probe_parser.add_argument("--expect")
+    probe_parser.add_argument("--interval", type=float, default=0.001)
+    probe_parser.add_argument("macs", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "probe":
+        probe_main(args)
+        return
+
+    if os.geteuid() != 0:
+        log("ERROR: network namespaces require root")
+        sys.exit(1)
+    if args.reservations < 1 or args.reservations + args.updates > 200 * 250:
+        # addresses are allocated from 10.200.0.1 - 10.200.199.250
+        log("ERROR: --reservations + --updates must be between 1 and 50000")
+        sys.exit(1)
+    if not 1 <= args.updates <= 254:
+        # changed reservations move to 10.200.200.1 - 10.200.200.254
+        log("ERROR: --updates must be between 1 and 254")
+        sys.exit(1)
+    if args.interval <= 0:
+        log("ERROR: --interval must be positive")
+        sys.exit(1)
+    bench(args)
+
+
+if __name__ == "__main__":
+    main()